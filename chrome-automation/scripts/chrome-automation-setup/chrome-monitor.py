@@ -20,7 +20,9 @@ import os
 import time
 import json
 import signal
-import threading
+import asyncio
+import re
+from collections import OrderedDict, deque, namedtuple
 from pathlib import Path
 
 # Set up environment before importing gi
@@ -31,7 +33,7 @@ os.environ['GNOME_ACCESSIBILITY'] = '1'
 
 import gi
 gi.require_version('Atspi', '2.0')
-from gi.repository import Atspi
+from gi.repository import Atspi, GLib
 
 # Configuration
 PID_FILE = "/tmp/chrome-monitor.pid"
@@ -50,6 +52,84 @@ DEFAULT_AUTO_DISMISS = [
     {"name": "Decline", "role": "push button", "context": "optional cookies"},
 ]
 
+# AT-SPI events that signal new or newly visible content
+WATCHED_EVENTS = [
+    "object:children-changed",
+    "object:property-change:accessible-name",
+    "object:state-changed:showing",
+    "window:activate",
+    "window:deactivate",
+]
+
+# Number of recently handled accessibles remembered to ignore duplicate events
+SEEN_CACHE_SIZE = 256
+
+# Seconds during which the same (role, name) is not clicked again
+DISMISS_DEBOUNCE = 0.5
+
+# Cached nodes before the attribute/children caches are reset wholesale
+NODE_CACHE_SIZE = 20000
+
+# Depth searched below a newly added node (e.g. the buttons of a new dialog)
+ADDED_SUBTREE_DEPTH = 10
+
+# A matched element: accessible, name and role name
+Match = namedtuple("Match", ["obj", "name", "role"])
+
+
+def _run_on_glib_loop(main):
+    """Run the coroutine main() on an asyncio loop driving GLib's default context.
+
+    AT-SPI delivers events through the default GLib main context, so the
+    asyncio loop must iterate it for listeners to fire. Returns False without
+    running anything if no integration is installed (PyGObject >= 3.50 ships
+    one; older setups can use asyncio-glib).
+    """
+    try:
+        from gi.events import GLibEventLoopPolicy
+    except ImportError:
+        pass
+    else:
+        # asyncio.run() would create a loop on a new, private main context
+        # (and PyGObject refuses to install it on the main thread); the
+        # policy's current loop wraps the default context instead
+        policy = GLibEventLoopPolicy()
+        asyncio.set_event_loop_policy(policy)
+        policy.get_event_loop().run_until_complete(main())
+        return True
+
+    try:
+        import asyncio_glib
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(asyncio_glib.GLibEventLoopPolicy())
+    asyncio.run(main())
+    return True
+
+
+def _build_role_index():
+    """Map non-localized role names ("push button") to Atspi.Role values."""
+    roles = {}
+    for value in range(int(Atspi.Role.LAST_DEFINED)):
+        role = Atspi.Role(value)
+        name = Atspi.role_get_name(role)
+        if name:
+            roles[name] = role
+    return roles
+
+
+ROLE_BY_NAME = _build_role_index()
+
+
+def role_from_name(role_name):
+    """Map a role name to its Atspi.Role (None if no role is given).
+
+    Unknown names map to Atspi.Role.INVALID so they match nothing.
+    """
+    if not role_name:
+        return None
+    return ROLE_BY_NAME.get(role_name.lower(), Atspi.Role.INVALID)
+
 
 class ChromeMonitor:
     """Monitor Chrome accessibility tree and perform automated actions."""
@@ -60,11 +140,23 @@ class ChromeMonitor:
         self.config = self._load_config()
         self.log_file = open(LOG_FILE, 'a')
         self.watchers = []
+        self._seen = OrderedDict()
+        self._last_dismiss_ts = {}  # (role, name) -> monotonic time of last click
+        self._attr_cache = {}      # node key -> (name, role or None if nameless)
+        self._children_cache = {}  # node key -> [child accessibles]
+        self._dismiss_index = self._build_dismiss_index()
+        self._chrome_app = None  # cached Chrome application accessible
+        self._chrome_pid = None  # process the node caches were filled from
+        self._stopped = None  # asyncio.Event while running under asyncio
+
+        self._listener = Atspi.EventListener.new(self._on_event)
+        for event_type in WATCHED_EVENTS:
+            self._listener.register(event_type)
 
     def _load_config(self):
         """Load configuration from file."""
         default_config = {
-            "poll_interval": 2.0,
+            "poll_interval": 30.0,  # Fallback full rescan; events handle the rest
             "auto_dismiss": DEFAULT_AUTO_DISMISS,
             "auto_dismiss_enabled": True,
             "log_elements": False,
@@ -80,6 +172,45 @@ class ChromeMonitor:
 
         return default_config
 
+    def _build_dismiss_index(self):
+        """Bucket auto-dismiss patterns by Atspi.Role (None = any role).
+
+        Each bucket is (regex, entries): one case-insensitive alternation of
+        the bucket's names, with group i matching entries[i - 1]. Entries are
+        [hits, name, role, pattern], re-sorted by hits after each dismissal.
+        """
+        buckets = {}
+        for pattern in self.config.get("auto_dismiss", []):
+            role = role_from_name(pattern.get("role"))
+            name = pattern.get("name") or ""
+            buckets.setdefault(role, []).append([0, name, role, pattern])
+        return {role: (self._compile_names(entries), entries)
+                for role, entries in buckets.items()}
+
+    def _compile_names(self, entries):
+        """Compile entry names into one alternation, one group per entry."""
+        return re.compile(
+            "|".join(f"({re.escape(entry[1])})" for entry in entries),
+            re.IGNORECASE
+        )
+
+    def _match_dismiss(self, name, role):
+        """Return the auto-dismiss entry matching a node, or None."""
+        for bucket_role in (role, None):
+            bucket = self._dismiss_index.get(bucket_role)
+            if bucket:
+                match = bucket[0].search(name)
+                if match:
+                    return bucket[1][match.lastindex - 1]
+        return None
+
+    def _record_dismiss(self, entry):
+        """Count a hit for entry and move frequent patterns to the front."""
+        entry[0] += 1
+        entries = self._dismiss_index[entry[2]][1]
+        entries.sort(key=lambda e: -e[0])
+        self._dismiss_index[entry[2]] = (self._compile_names(entries), entries)
+
     def _log(self, message):
         """Log a message."""
         timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
@@ -90,47 +221,188 @@ class ChromeMonitor:
 
     def _find_chrome(self):
         """Find Chrome in accessibility tree."""
+        # The cached app stays valid while its process is alive
+        if self._chrome_app is not None:
+            try:
+                if self._chrome_app.get_process_id() != 0:
+                    return self._chrome_app
+            except GLib.Error:
+                pass
+            self._chrome_app = None
+
         desktop = Atspi.get_desktop(0)
         for i in range(desktop.get_child_count()):
             app = desktop.get_child_at_index(i)
-            if app:
-                name = (app.get_name() or "").lower()
-                if "chrome" in name or "chromium" in name:
-                    return app
+            if app and self._is_chrome_app(app):
+                self._set_chrome_app(app)
+                return app
         return None
 
-    def _find_elements(self, obj, name_filter=None, role_filter=None,
-                       depth=0, max_depth=25, results=None):
-        """Find elements matching criteria."""
-        if results is None:
-            results = []
-
-        if obj is None or depth > max_depth:
-            return results
-
+    def _set_chrome_app(self, app):
+        """Cache app as Chrome, dropping node state if it is a new process."""
         try:
-            role = obj.get_role_name()
-            name = obj.get_name() or ""
+            pid = app.get_process_id()
+        except GLib.Error:
+            pid = None
+        if pid != self._chrome_pid:
+            self._attr_cache.clear()
+            self._children_cache.clear()
+            self._seen.clear()
+            self._chrome_pid = pid
+        self._chrome_app = app
+
+    def _is_chrome_app(self, app):
+        """Return True if app is a Chrome/Chromium application accessible."""
+        name = (app.get_name() or "").lower()
+        return "chrome" in name or "chromium" in name
+
+    def _from_chrome(self, obj):
+        """Return True if obj belongs to Chrome rather than another app."""
+        try:
+            app = obj.get_application()
+        except GLib.Error:
+            return False
+        if app is None:
+            return False
+        if app == self._chrome_app:
+            return True
+        if self._is_chrome_app(app):
+            self._set_chrome_app(app)
+            return True
+        return False
 
-            match = True
-            if name_filter and name_filter.lower() not in name.lower():
-                match = False
-            if role_filter and role_filter.lower() != role.lower():
-                match = False
-
-            if match and name:
-                results.append({
-                    'obj': obj,
-                    'name': name,
-                    'role': role,
-                })
-
-            for i in range(obj.get_child_count()):
-                self._find_elements(obj.get_child_at_index(i), name_filter,
-                                   role_filter, depth + 1, max_depth, results)
-        except:
-            pass
+    def _node_key(self, obj):
+        """Return (bus name, object path) identifying obj, or None.
+
+        Object paths are only unique per D-Bus connection (every app has
+        /org/a11y/atspi/accessible/root), so the path alone can collide.
+        """
+        path = getattr(obj, "path", None)
+        if path is None:
+            return None
+        return (getattr(getattr(obj, "app", None), "bus_name", None), path)
+
+    def _get_name_role(self, obj):
+        """Return (name, role) for obj, using the event-invalidated cache.
+
+        The role is only fetched for named nodes; nameless nodes never match.
+        """
+        key = self._node_key(obj)
+        attrs = self._attr_cache.get(key) if key else None
+        if attrs is None:
+            name = obj.get_name() or ""
+            attrs = (name, obj.get_role() if name else None)
+            if key:
+                self._cache_put(self._attr_cache, key, attrs)
+        return attrs
+
+    def _get_children(self, obj):
+        """Fetch all children of obj, using the event-invalidated cache."""
+        key = self._node_key(obj)
+        children = self._children_cache.get(key) if key else None
+        if children is None:
+            children = [obj.get_child_at_index(i)
+                        for i in range(obj.get_child_count())]
+            if key:
+                self._cache_put(self._children_cache, key, children)
+        return children
+
+    def _cache_put(self, cache, key, value):
+        """Store a cache entry, resetting the cache if it grows too large."""
+        if len(cache) >= NODE_CACHE_SIZE:
+            cache.clear()
+        cache[key] = value
+
+    def _invalidate(self, event):
+        """Drop cached data made stale by an AT-SPI event."""
+        key = self._node_key(event.source)
+        if event.type.startswith("window:"):
+            self._attr_cache.pop(key, None)
+        elif event.type.startswith("object:children-changed"):
+            self._children_cache.pop(key, None)
+            if ":remove" in event.type:
+                child_key = self._node_key(event.any_data)
+                self._attr_cache.pop(child_key, None)
+                self._children_cache.pop(child_key, None)
+        else:
+            self._attr_cache.pop(key, None)
+
+    def _get_matches(self, obj, roles):
+        """Fetch nodes under obj with any of roles in one Collection call.
+
+        An empty roles list matches every role. Returns None when obj has no
+        Collection interface, so callers can fall back to a manual walk.
+        """
+        try:
+            collection = obj.get_collection_iface()
+            if collection is None:
+                return None
+
+            match_all = Atspi.CollectionMatchType.ALL
+            rule = Atspi.MatchRule.new(
+                Atspi.StateSet.new([]), match_all,
+                {}, match_all,
+                roles, Atspi.CollectionMatchType.ANY if roles else match_all,
+                [], match_all,
+                False
+            )
+            return collection.get_matches(
+                rule, Atspi.CollectionSortOrder.CANONICAL, 0, True)
+        except Exception:
+            return None
+
+    def _walk(self, root, max_depth=25):
+        """Yield (obj, name, role) for named nodes under root, in tree order."""
+        stack = deque([(root, 0)])
+        pop = stack.pop
+        push = stack.append
+        get_name_role = self._get_name_role
+        get_children = self._get_children
+
+        while stack:
+            obj, depth = pop()
+            if obj is None or depth > max_depth:
+                continue
 
+            try:
+                name, role = get_name_role(obj)
+                children = get_children(obj)
+            except GLib.Error:
+                continue
+
+            if name:
+                yield obj, name, role
+
+            depth += 1
+            for child in reversed(children):
+                push((child, depth))
+
+    def _find_elements(self, obj, name_search=None, role=None, max_depth=25):
+        """Find elements matching criteria.
+
+        name_search is a callable such as a compiled regex's search (None
+        matches any name); role is an Atspi.Role (None matches any role).
+        """
+        results = []
+
+        if role is not None:
+            matches = self._get_matches(obj, [role])
+            if matches is not None:
+                role_name = Atspi.role_get_name(role)
+                for match in matches:
+                    try:
+                        name, _ = self._get_name_role(match)
+                    except GLib.Error:
+                        continue
+                    if name and (not name_search or name_search(name)):
+                        results.append(Match(match, name, role_name))
+                return results
+
+        for node, name, node_role in self._walk(obj, max_depth):
+            if role is not None and role != node_role:
+                continue
+            if not name_search or name_search(name):
+                results.append(Match(node, name, Atspi.role_get_name(node_role)))
         return results
 
     def _click_element(self, obj):
@@ -144,24 +416,111 @@ class ChromeMonitor:
             pass
         return False
 
+    def _object_key(self, obj):
+        """Return a key identifying an accessible across events."""
+        return self._node_key(obj) or id(obj)
+
+    def _remember(self, obj):
+        """Record obj as handled; return False if it was handled recently."""
+        key = self._object_key(obj)
+        if key in self._seen:
+            self._seen.move_to_end(key)
+            return False
+        self._seen[key] = True
+        if len(self._seen) > SEEN_CACHE_SIZE:
+            self._seen.popitem(last=False)
+        return True
+
+    def _inspect(self, obj, name, role):
+        """Match a single named accessible against auto-dismiss patterns and watchers."""
+        if self.config.get("auto_dismiss_enabled"):
+            if self._match_dismiss(name, role):
+                if self._remember(obj):
+                    self._dismiss(obj, name, role)
+                return
+
+        for watcher in self.watchers[:]:
+            watch_role = watcher["role_value"]
+            if watcher["name_re"].search(name) and (
+                    watch_role is None or watch_role == role):
+                self._trigger_watcher(
+                    watcher, Match(obj, name, Atspi.role_get_name(role)))
+
+    def _on_event(self, event):
+        """Handle an AT-SPI event by inspecting only the nodes it concerns."""
+        try:
+            # The listener sees the whole desktop; only act on Chrome's nodes
+            if event.source is None or not self._from_chrome(event.source):
+                return
+
+            self._invalidate(event)
+
+            if event.type.startswith("object:children-changed"):
+                if ":add" not in event.type or event.any_data is None:
+                    return
+                # A new dialog arrives as one event for its root; search the
+                # subtree so its buttons are found without a full rescan
+                for node, name, role in self._walk(event.any_data,
+                                                   ADDED_SUBTREE_DEPTH):
+                    self._inspect(node, name, role)
+                return
+            elif event.type.startswith("object:state-changed") and not event.detail1:
+                return
+            elif event.type.startswith("window:deactivate"):
+                return
+
+            name, role = self._get_name_role(event.source)
+            if name:
+                self._inspect(event.source, name, role)
+        except Exception as e:
+            self._log(f"Error handling {event.type}: {e}")
+
     def _check_auto_dismiss(self, chrome):
         """Check for and dismiss popups/dialogs."""
         if not self.config.get("auto_dismiss_enabled"):
             return
 
-        for pattern in self.config.get("auto_dismiss", []):
-            elements = self._find_elements(
-                chrome,
-                name_filter=pattern.get("name"),
-                role_filter=pattern.get("role")
-            )
-
-            for elem in elements:
-                if self._click_element(elem['obj']):
-                    self._log(f"Auto-dismissed: [{elem['role']}] {elem['name']}")
-                    time.sleep(0.5)  # Brief pause after clicking
-                    return True
-
+        # Let the application filter by role server-side in one call; an
+        # any-role pattern needs every node, so match all roles then
+        roles = [] if None in self._dismiss_index else list(self._dismiss_index)
+        matches = self._get_matches(chrome, roles)
+
+        if matches is None:
+            # One walk tests every pattern, instead of one walk per pattern
+            dismissed = any(self._dismiss(obj, name, role)
+                            for obj, name, role in self._walk(chrome))
+        else:
+            dismissed = False
+            for match in matches:
+                try:
+                    name, role = self._get_name_role(match)
+                except GLib.Error:
+                    continue
+                if name and self._dismiss(match, name, role):
+                    dismissed = True
+                    break
+
+        return dismissed
+
+    def _dismiss(self, obj, name, role):
+        """Click obj if it matches a dismiss pattern; return True if clicked."""
+        entry = self._match_dismiss(name, role)
+        if not entry:
+            return False
+
+        # Debounce instead of sleeping after a click: the same dialog may
+        # still be in the tree for a moment, so don't click it twice
+        key = (role, name)
+        now = time.monotonic()
+        last = self._last_dismiss_ts.get(key)
+        if last is not None and now - last < DISMISS_DEBOUNCE:
+            return False
+
+        if self._click_element(obj):
+            self._last_dismiss_ts[key] = now
+            self._record_dismiss(entry)
+            self._log(f"Auto-dismissed: [{Atspi.role_get_name(role)}] {name}")
+            return True
         return False
 
     def _check_watchers(self, chrome):
@@ -169,23 +528,26 @@ class ChromeMonitor:
         for watcher in self.watchers[:]:  # Copy list to allow modification
             elements = self._find_elements(
                 chrome,
-                name_filter=watcher.get("name"),
-                role_filter=watcher.get("role")
+                name_search=watcher["name_re"].search,
+                role=watcher["role_value"]
             )
 
             if elements:
-                elem = elements[0]
-                self._log(f"Watcher triggered: [{elem['role']}] {elem['name']}")
+                self._trigger_watcher(watcher, elements[0])
 
-                # Execute callback or action
-                action = watcher.get("action", "log")
-                if action == "click":
-                    self._click_element(elem['obj'])
-                    self._log(f"  -> Clicked")
+    def _trigger_watcher(self, watcher, elem):
+        """Run a watcher's action for a matched element."""
+        self._log(f"Watcher triggered: [{elem.role}] {elem.name}")
 
-                # Remove one-shot watchers
-                if watcher.get("one_shot", False):
-                    self.watchers.remove(watcher)
+        # Execute callback or action
+        action = watcher.get("action", "log")
+        if action == "click":
+            self._click_element(elem.obj)
+            self._log(f"  -> Clicked")
+
+        # Remove one-shot watchers
+        if watcher.get("one_shot", False) and watcher in self.watchers:
+            self.watchers.remove(watcher)
 
     def add_watcher(self, name, role=None, action="log", one_shot=False):
         """Add a watcher for an element."""
@@ -194,37 +556,75 @@ class ChromeMonitor:
             "role": role,
             "action": action,
             "one_shot": one_shot,
+            "name_re": re.compile(re.escape(name or ""), re.IGNORECASE),
+            "role_value": role_from_name(role),
         })
         self._log(f"Added watcher for: {name}")
 
-    def run(self):
-        """Main monitoring loop."""
-        self.running = True
-        self._log("Chrome Monitor started")
+    def _scan(self):
+        """Full tree scan, used at startup and as a slow fallback to events."""
+        try:
+            chrome = self._find_chrome()
+
+            if chrome:
+                self._check_auto_dismiss(chrome)
+                self._check_watchers(chrome)
+            else:
+                if self.config.get("log_elements"):
+                    self._log("Chrome not found")
+
+        except Exception as e:
+            self._log(f"Error in monitor loop: {e}")
 
-        poll_interval = self.config.get("poll_interval", 2.0)
+        return self.running
+
+    def _on_signal(self):
+        """Stop the event loop on SIGTERM/SIGINT."""
+        self.stop()
+        return False
 
+    async def _poll_fallback(self, poll_interval):
+        """Periodically rescan the full tree in case events were missed."""
         while self.running:
-            try:
-                chrome = self._find_chrome()
+            self._scan()
+            await asyncio.sleep(poll_interval)
 
-                if chrome:
-                    self._check_auto_dismiss(chrome)
-                    self._check_watchers(chrome)
-                else:
-                    if self.config.get("log_elements"):
-                        self._log("Chrome not found")
+    async def _main(self, poll_interval):
+        """Run the fallback scanner until stop(); events share the loop."""
+        loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
 
-            except Exception as e:
-                self._log(f"Error in monitor loop: {e}")
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, self.stop)
 
-            time.sleep(poll_interval)
+        poller = asyncio.create_task(self._poll_fallback(poll_interval))
+        await self._stopped.wait()
+        poller.cancel()
+
+    def run(self):
+        """Main monitoring loop, driven by AT-SPI events."""
+        self.running = True
+        self._log("Chrome Monitor started")
+
+        poll_interval = self.config.get("poll_interval", 30.0)
+
+        if not _run_on_glib_loop(lambda: self._main(poll_interval)):
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signum, self._on_signal)
+
+            self._scan()
+            GLib.timeout_add(int(poll_interval * 1000), self._scan)
+            Atspi.event_main()
 
         self._log("Chrome Monitor stopped")
 
     def stop(self):
         """Stop the monitor."""
         self.running = False
+        if self._stopped is not None:
+            self._stopped.set()
+        else:
+            Atspi.event_quit()
 
 
 def write_pid():
@@ -279,16 +679,10 @@ def start_daemon():
     write_pid()
 
     monitor = ChromeMonitor()
-
-    def signal_handler(signum, frame):
-        monitor.stop()
+    try:
+        monitor.run()
+    finally:
         remove_pid()
-        sys.exit(0)
-
-    signal.signal(signal.SIGTERM, signal_handler)
-    signal.signal(signal.SIGINT, signal_handler)
-
-    monitor.run()
 
 
 def stop_daemon():
@@ -331,10 +725,7 @@ def main():
     elif command == "run":
         # Run in foreground (for debugging)
         monitor = ChromeMonitor()
-        try:
-            monitor.run()
-        except KeyboardInterrupt:
-            monitor.stop()
+        monitor.run()
     else:
         print(f"Unknown command: {command}")
         print(__doc__)
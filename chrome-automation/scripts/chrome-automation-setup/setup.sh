@@ -75,7 +75,7 @@ echo ""
 echo "[5/5] Creating default configuration..."
 cat > ~/.chrome-monitor.json << 'EOF'
 {
-    "poll_interval": 2.0,
+    "poll_interval": 30.0,
     "auto_dismiss_enabled": true,
     "auto_dismiss": [
         {"name": "Not now", "role": "push button"},
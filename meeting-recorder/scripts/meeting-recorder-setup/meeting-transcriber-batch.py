@@ -10,6 +10,8 @@ Usage:
     parecord ... | meeting-transcriber-batch.py <meeting_id> <meeting_url>
 """
 
+import heapq
+import importlib.util
 import io
 import json
 import struct
@@ -18,28 +20,118 @@ import os
 import re
 import signal
 import time
-import wave
 import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timezone
 from pathlib import Path
-from queue import Queue, Empty
 
 try:
-    import requests
+    import httpx
 except ImportError:
-    print("Error: requests package not installed. Run: pip install requests", file=sys.stderr)
+    print("Error: httpx package not installed. Run: pip install 'httpx[http2]'", file=sys.stderr)
     sys.exit(1)
 
+# HTTP/2 needs the optional h2 package (httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # Disables compression and the silence gate
+
+try:
+    import soundfile
+except ImportError:
+    soundfile = None  # Uploads fall back to uncompressed WAV
+
 # Configuration (can be overridden via environment)
 SAMPLE_RATE = int(os.getenv("SAMPLE_RATE", "24000"))
 CHUNK_DURATION = float(os.getenv("CHUNK_DURATION", "5"))  # seconds per batch
 SPEACHES_URL = os.getenv("SPEACHES_URL", "http://localhost:8000")
 TRANSCRIPTION_MODEL = os.getenv("TRANSCRIPTION_MODEL", "Systran/faster-distil-whisper-small.en")
 MEETINGS_DIR = os.getenv("MEETINGS_DIR", "/tmp/meetings")
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "3"))  # concurrent uploads
+UPLOAD_FORMAT = os.getenv("UPLOAD_FORMAT", "opus").lower()  # opus, flac or wav
+SILENCE_THRESHOLD = float(os.getenv("SILENCE_THRESHOLD", "200"))  # RMS; 0 disables
+
+# Compressed upload formats: (filename, content type, soundfile format, subtype)
+COMPRESSED_FORMATS = {
+    "opus": ("audio.ogg", "audio/ogg", "OGG", "OPUS"),
+    "flac": ("audio.flac", "audio/flac", "FLAC", "PCM_16"),
+}
+
+# Server errors retried with a short backoff before a chunk is given up
+RETRY_STATUSES = (502, 503, 504)
+MAX_RETRIES = 2
+RETRY_BACKOFF = 0.2  # seconds, doubled per retry
+
+# Seconds to wait for in-flight uploads on shutdown; stop-meeting.sh sends
+# SIGKILL 5s after SIGTERM, so this stays well inside that grace period
+SHUTDOWN_DRAIN_TIMEOUT = 2.0
+
+# Sample rates the Opus codec accepts
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
 
 # Mention detection keywords (loaded from config)
 MENTION_KEYWORDS = ["claude", "assistant", "ai"]
 
+# Phrases that mark a mention as a question
+QUESTION_PHRASES = (
+    "what do you think",
+    "can you",
+    "could you",
+    "would you",
+    "do you know",
+    "what about",
+    "hey claude",
+    "hey assistant",
+)
+QUESTION_RE = re.compile("|".join(re.escape(p) for p in QUESTION_PHRASES), re.IGNORECASE)
+
+
+class ChainedReader(io.RawIOBase):
+    """Seekable read-only stream over several buffers, without joining them"""
+
+    def __init__(self, *parts):
+        self._parts = [memoryview(part).cast("B") for part in parts]
+        self._size = sum(len(part) for part in self._parts)
+        self._pos = 0
+
+    def __len__(self):
+        return self._size
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._pos = max(0, min(offset, self._size))
+        return self._pos
+
+    def readinto(self, buffer):
+        out = memoryview(buffer).cast("B")
+        written = 0
+        start = 0
+        for part in self._parts:
+            end = start + len(part)
+            if start <= self._pos < end and written < len(out):
+                offset = self._pos - start
+                n = min(len(part) - offset, len(out) - written)
+                out[written:written + n] = part[offset:offset + n]
+                written += n
+                self._pos += n
+            start = end
+        return written
+
 
 class MeetingTranscriberBatch:
     def __init__(self, meeting_id: str, meeting_url: str):
@@ -50,7 +142,43 @@ class MeetingTranscriberBatch:
         self.metadata_path = self.meeting_dir / "metadata.json"
         self.mentions_path = self.meeting_dir / "mentions.txt"
         self.running = True
-        self.audio_queue = Queue()
+        self._signalled = False  # stopped by SIGINT/SIGTERM rather than EOF
+
+        self._upload_format = self._select_upload_format()
+        self._quiet_chunks = 0  # consecutive chunks below SILENCE_THRESHOLD
+
+        # Uploads run concurrently; results are written back in chunk order
+        self._executor = ThreadPoolExecutor(max_workers=TRANSCRIBE_WORKERS)
+        self._write_lock = threading.Lock()
+        self._next_seq = 0    # sequence number of the next chunk to write
+        self._pending = []    # min-heap of (seq, transcript) finished early
+        self._in_flight = set()  # futures of submitted uploads
+
+        # 16-bit mono PCM WAV header; only the two size fields vary per chunk
+        self._wav_header_template = struct.pack(
+            '<4sI4s4sIHHIIHH4sI',
+            b'RIFF', 0, b'WAVE',
+            b'fmt ', 16, 1, 1, SAMPLE_RATE, SAMPLE_RATE * 2, 2, 16,
+            b'data', 0
+        )
+
+        # Reuse keep-alive connections for every chunk upload. Over HTTP/2
+        # (https:// with h2 installed) concurrent uploads share one connection;
+        # otherwise each worker keeps its own HTTP/1.1 connection.
+        # The pool is sized on the transport: httpx.Client ignores its own
+        # http2/limits arguments when an explicit transport is given.
+        self._client = httpx.Client(
+            base_url=SPEACHES_URL,
+            timeout=30.0,
+            transport=httpx.HTTPTransport(
+                http2=HTTP2_AVAILABLE,
+                retries=MAX_RETRIES,
+                limits=httpx.Limits(
+                    max_connections=TRANSCRIBE_WORKERS,
+                    max_keepalive_connections=TRANSCRIBE_WORKERS,
+                ),
+            ),
+        )
 
         # Load config if available
         self._load_config()
@@ -67,17 +195,23 @@ class MeetingTranscriberBatch:
             except Exception:
                 pass
 
+        # Compile keyword checks once instead of scanning per keyword
+        self._mention_re = re.compile(
+            r"\b(" + "|".join(re.escape(k) for k in MENTION_KEYWORDS) + r")\b"
+            if MENTION_KEYWORDS else r"(?!)",
+            re.IGNORECASE
+        )
+        # Transcripts shorter than every keyword cannot contain a mention
+        self._min_mention_len = min(map(len, MENTION_KEYWORDS), default=0)
+
     def setup_meeting_directory(self):
         """Create meeting directory and initialize files"""
         self.meeting_dir.mkdir(parents=True, exist_ok=True)
 
-        # Initialize transcript file (don't overwrite if exists)
-        if not self.transcript_path.exists():
-            self.transcript_path.write_text("")
-
-        # Initialize mentions file
-        if not self.mentions_path.exists():
-            self.mentions_path.write_text("")
+        # Open transcript and mentions files for appending (created if missing,
+        # never overwritten). Line buffering flushes each line as it is written.
+        self._transcript_fh = open(self.transcript_path, "a", buffering=1)
+        self._mentions_fh = open(self.mentions_path, "a", buffering=1)
 
         # Create or update metadata
         metadata = {
@@ -110,66 +244,133 @@ class MeetingTranscriberBatch:
                 pass
         return "Claude Assistant"
 
+    def _select_upload_format(self):
+        """Pick the compressed upload format, or None to upload WAV"""
+        if soundfile is None or np is None or UPLOAD_FORMAT == "wav":
+            return None
+        if (UPLOAD_FORMAT == "opus"
+                and SAMPLE_RATE in OPUS_SAMPLE_RATES
+                and "OPUS" in soundfile.available_subtypes("OGG")):
+            return COMPRESSED_FORMATS["opus"]
+        # Lossless, and available in every libsndfile build
+        return COMPRESSED_FORMATS["flac"]
+
+    def _encode_chunk(self, chunk: bytes):
+        """Encode a PCM chunk for upload; returns (filename, content_type, parts)"""
+        if self._upload_format is not None:
+            filename, content_type, file_format, subtype = self._upload_format
+            samples = np.frombuffer(chunk, dtype=np.int16, count=len(chunk) // 2)
+            buffer = io.BytesIO()
+            soundfile.write(buffer, samples, SAMPLE_RATE,
+                            format=file_format, subtype=subtype)
+            return filename, content_type, (buffer.getbuffer(),)
+
+        return "audio.wav", "audio/wav", (self._wav_header(len(chunk)), chunk)
+
+    def _wav_header(self, data_size: int) -> bytes:
+        """Build the WAV header for a chunk of data_size PCM bytes"""
+        template = self._wav_header_template
+        return (template[:4] + struct.pack('<I', 36 + data_size)
+                + template[8:40] + struct.pack('<I', data_size))
+
     def read_audio(self):
-        """Read audio from stdin and queue it for processing"""
+        """Read audio from stdin and submit it to the transcription workers"""
         bytes_per_chunk = int(SAMPLE_RATE * CHUNK_DURATION * 2)  # 16-bit = 2 bytes per sample
 
         print(f"Reading audio at {SAMPLE_RATE}Hz, {CHUNK_DURATION}s chunks ({bytes_per_chunk} bytes)", file=sys.stderr)
+        print(f"Transcription endpoint: {SPEACHES_URL}/v1/audio/transcriptions", file=sys.stderr)
+        upload_type = self._upload_format[1] if self._upload_format else "audio/wav"
+        print(f"Uploading audio as {upload_type}", file=sys.stderr)
+
+        # Read into one reusable buffer; only the submitted copy is allocated
+        buf = bytearray(bytes_per_chunk)
+        view = memoryview(buf)
+        seq = 0
 
         while self.running:
             try:
-                chunk = sys.stdin.buffer.read(bytes_per_chunk)
-                if not chunk:
+                n = sys.stdin.buffer.readinto(buf)
+                if not n:
                     print("Audio stream ended", file=sys.stderr)
                     break
-                if len(chunk) >= bytes_per_chunk // 2:  # At least half a chunk
-                    self.audio_queue.put(chunk)
+                if n < bytes_per_chunk // 2:  # At least half a chunk
+                    continue
+
+                chunk = bytes(view[:n])
+
+                # Skip silence, but still send the first quiet chunk after
+                # speech in case it carries the tail of an utterance
+                if self._is_silent(chunk):
+                    self._quiet_chunks += 1
+                    if self._quiet_chunks > 1:
+                        continue
+                else:
+                    self._quiet_chunks = 0
+
+                future = self._executor.submit(self._transcribe_and_write, chunk, seq)
+                self._in_flight.add(future)
+                future.add_done_callback(self._in_flight.discard)
+                seq += 1
             except Exception as e:
                 print(f"Error reading audio: {e}", file=sys.stderr)
                 break
 
         self.running = False
 
-    def process_audio(self):
-        """Process queued audio chunks and transcribe them"""
-        print(f"Transcription endpoint: {SPEACHES_URL}/v1/audio/transcriptions", file=sys.stderr)
-
-        while self.running or not self.audio_queue.empty():
-            try:
-                chunk = self.audio_queue.get(timeout=1)
-            except Empty:
-                continue
-
-            try:
-                # Convert PCM to WAV in memory
-                wav_buffer = io.BytesIO()
-                with wave.open(wav_buffer, 'wb') as wav_file:
-                    wav_file.setnchannels(1)
-                    wav_file.setsampwidth(2)  # 16-bit
-                    wav_file.setframerate(SAMPLE_RATE)
-                    wav_file.writeframes(chunk)
-                wav_buffer.seek(0)
+    def _is_silent(self, chunk: bytes) -> bool:
+        """Check if a PCM chunk's RMS level is below SILENCE_THRESHOLD"""
+        if np is None or SILENCE_THRESHOLD <= 0:
+            return False
+        samples = np.frombuffer(chunk, dtype=np.int16, count=len(chunk) // 2)
+        samples = samples.astype(np.int32)
+        rms = np.sqrt(np.mean(samples * samples))
+        return rms < SILENCE_THRESHOLD
+
+    def _transcribe_and_write(self, chunk: bytes, seq: int):
+        """Transcribe one chunk, then write any transcripts now in order"""
+        transcript = ""
+        try:
+            transcript = self._transcribe(chunk)
+        finally:
+            with self._write_lock:
+                heapq.heappush(self._pending, (seq, transcript))
+                while self._pending and self._pending[0][0] == self._next_seq:
+                    _, text = heapq.heappop(self._pending)
+                    self._next_seq += 1
+                    if text and not self._transcript_fh.closed:
+                        self._write_transcript(text)
+
+    def _transcribe(self, chunk: bytes) -> str:
+        """Send a PCM chunk to Speaches and return its transcript ("" on failure)"""
+        try:
+            # Stream the encoded audio as the file part, without copying;
+            # httpx rewinds the seekable body if the request is retried
+            filename, audio_type, parts = self._encode_chunk(chunk)
+            body = ChainedReader(*parts)
 
+            for attempt in range(MAX_RETRIES + 1):
                 # Send to Speaches
-                response = requests.post(
-                    f"{SPEACHES_URL}/v1/audio/transcriptions",
-                    files={"file": ("audio.wav", wav_buffer, "audio/wav")},
+                response = self._client.post(
+                    "/v1/audio/transcriptions",
+                    files={"file": (filename, body, audio_type)},
                     data={"model": TRANSCRIPTION_MODEL},
-                    timeout=30
                 )
+                if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                    break
+                time.sleep(RETRY_BACKOFF * 2 ** attempt)
 
-                if response.status_code == 200:
-                    result = response.json()
-                    transcript = result.get("text", "").strip()
-                    if transcript:
-                        self._write_transcript(transcript)
-                else:
-                    print(f"Transcription error {response.status_code}: {response.text[:100]}", file=sys.stderr)
+            if response.status_code == 200:
+                result = response.json()
+                return result.get("text", "").strip()
 
-            except requests.RequestException as e:
-                print(f"Request error: {e}", file=sys.stderr)
-            except Exception as e:
-                print(f"Processing error: {e}", file=sys.stderr)
+            print(f"Transcription error {response.status_code}: {response.text[:100]}", file=sys.stderr)
+
+        except httpx.HTTPError as e:
+            print(f"Request error: {e}", file=sys.stderr)
+        except Exception as e:
+            print(f"Processing error: {e}", file=sys.stderr)
+
+        return ""
 
     def _write_transcript(self, transcript: str):
         """Write transcript line and check for mentions"""
@@ -177,8 +378,7 @@ class MeetingTranscriberBatch:
         line = f"[{timestamp}] {transcript}\n"
 
         # Append to transcript file
-        with open(self.transcript_path, "a") as f:
-            f.write(line)
+        self._transcript_fh.write(line)
 
         # Also print to stderr for debugging
         print(f"[{timestamp}] {transcript}", file=sys.stderr)
@@ -188,37 +388,23 @@ class MeetingTranscriberBatch:
 
     def _check_mentions(self, timestamp: str, transcript: str):
         """Check if transcript contains mention keywords + question"""
-        lower_transcript = transcript.lower()
-
         # Check for keyword mentions
-        for keyword in MENTION_KEYWORDS:
-            if keyword.lower() in lower_transcript:
-                # Check if it's a question (contains ?)
-                is_question = "?" in transcript
-
-                # Also detect question phrases
-                question_phrases = [
-                    "what do you think",
-                    "can you",
-                    "could you",
-                    "would you",
-                    "do you know",
-                    "what about",
-                    "hey claude",
-                    "hey assistant"
-                ]
-                is_question = is_question or any(p in lower_transcript for p in question_phrases)
-
-                if is_question:
-                    mention_line = f"[{timestamp}] QUESTION: {transcript}\n"
-                else:
-                    mention_line = f"[{timestamp}] MENTION: {transcript}\n"
+        if len(transcript) < self._min_mention_len:
+            return
+        if not self._mention_re.search(transcript):
+            return
 
-                with open(self.mentions_path, "a") as f:
-                    f.write(mention_line)
+        # Question if it contains ? or a question phrase
+        is_question = "?" in transcript or QUESTION_RE.search(transcript) is not None
 
-                print(f">>> MENTION DETECTED: {transcript}", file=sys.stderr)
-                break
+        if is_question:
+            mention_line = f"[{timestamp}] QUESTION: {transcript}\n"
+        else:
+            mention_line = f"[{timestamp}] MENTION: {transcript}\n"
+
+        self._mentions_fh.write(mention_line)
+
+        print(f">>> MENTION DETECTED: {transcript}", file=sys.stderr)
 
     def update_metadata_ended(self):
         """Update metadata when meeting ends"""
@@ -238,6 +424,7 @@ class MeetingTranscriberBatch:
         # Setup signal handlers
         def signal_handler(sig, frame):
             print("\nShutting down...", file=sys.stderr)
+            self._signalled = True
             self.running = False
 
         signal.signal(signal.SIGINT, signal_handler)
@@ -246,23 +433,29 @@ class MeetingTranscriberBatch:
         # Setup meeting directory
         self.setup_meeting_directory()
 
-        # Start threads
+        # Start reader; it submits chunks straight to the worker pool
         reader_thread = threading.Thread(target=self.read_audio, daemon=True)
-        processor_thread = threading.Thread(target=self.process_audio, daemon=True)
 
         print("Starting transcription...", file=sys.stderr)
         reader_thread.start()
-        processor_thread.start()
 
         try:
             while self.running:
                 time.sleep(0.5)
         except KeyboardInterrupt:
+            self._signalled = True
             self.running = False
 
-        # Wait for threads to finish
+        # Wait for the reader to finish
         reader_thread.join(timeout=2)
-        processor_thread.join(timeout=5)
+
+        if self._signalled:
+            # stop-meeting.sh follows up with SIGKILL: drop queued chunks and
+            # mark the meeting ended before a bounded drain of running uploads
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        else:
+            # End of audio: transcribe everything that was queued
+            self._executor.shutdown(wait=True)
 
         self.update_metadata_ended()
 
@@ -274,6 +467,15 @@ class MeetingTranscriberBatch:
             except Exception:
                 pass
 
+        # Let in-flight uploads finish so their transcripts are written
+        if self._signalled:
+            wait(list(self._in_flight), timeout=SHUTDOWN_DRAIN_TIMEOUT)
+        self._client.close()
+
+        with self._write_lock:
+            self._transcript_fh.close()
+            self._mentions_fh.close()
+
         print("Transcriber stopped", file=sys.stderr)
 
 
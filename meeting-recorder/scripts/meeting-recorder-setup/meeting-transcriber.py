@@ -12,11 +12,13 @@ Usage:
 
 import asyncio
 import base64
+import inspect
 import json
 import sys
 import os
 import re
 import signal
+import time
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -27,16 +29,67 @@ except ImportError:
     print("Error: websockets package not installed. Run: pip install websockets", file=sys.stderr)
     sys.exit(1)
 
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Falls back to the stdlib json module
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None  # Stock asyncio event loop
+
 # Configuration (can be overridden via environment)
 SAMPLE_RATE = int(os.getenv("SAMPLE_RATE", "24000"))
 CHUNK_SIZE = SAMPLE_RATE  # 1 second of 16-bit mono audio = sample_rate * 2 bytes
 SPEACHES_URL = os.getenv("SPEACHES_URL", "ws://localhost:8000/v1/realtime")
 TRANSCRIPTION_MODEL = os.getenv("TRANSCRIPTION_MODEL", "Systran/faster-distil-whisper-small.en")
 MEETINGS_DIR = os.getenv("MEETINGS_DIR", "/tmp/meetings")
+SAVE_RAW_AUDIO = os.getenv("SAVE_RAW_AUDIO", "0") == "1"  # archive PCM to audio.pcm
+
+# Archived audio is written in batches of this many chunks per os.writev
+RAW_AUDIO_BATCH = 16
+
+# input_audio_buffer.append event split around its base64 payload, so the
+# JSON envelope is not rebuilt and re-serialized for every chunk
+AUDIO_APPEND_PREFIX = b'{"type":"input_audio_buffer.append","audio":"'
+AUDIO_APPEND_SUFFIX = b'"}'
 
 # Mention detection keywords (loaded from config)
 MENTION_KEYWORDS = ["claude", "assistant", "ai"]
 
+# Phrases that mark a mention as a question
+QUESTION_PHRASES = (
+    "what do you think",
+    "can you",
+    "could you",
+    "would you",
+    "do you know",
+    "what about",
+    "hey claude",
+    "hey assistant",
+)
+QUESTION_RE = re.compile("|".join(re.escape(p) for p in QUESTION_PHRASES), re.IGNORECASE)
+
+# Google Meet URL: meet.google.com/xxx-yyyy-zzz
+_MEET_ID_RE = re.compile(r'meet\.google\.com/([a-z]{3}-[a-z]{4}-[a-z]{3})', re.IGNORECASE)
+
+
+def json_loads(data):
+    """Parse a JSON message (orjson when available)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def write_json(path: Path, data):
+    """Write data to path as indented JSON (orjson when available)"""
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+
 
 class MeetingTranscriber:
     def __init__(self, meeting_id: str, meeting_url: str):
@@ -46,25 +99,67 @@ class MeetingTranscriber:
         self.transcript_path = self.meeting_dir / "transcript.txt"
         self.metadata_path = self.meeting_dir / "metadata.json"
         self.mentions_path = self.meeting_dir / "mentions.txt"
+        self.raw_audio_path = self.meeting_dir / "audio.pcm"
         self.ws = None
         self.running = True
         self.reconnect_delay = 1
         self.max_reconnect_delay = 30
+        self._reader = None  # asyncio.StreamReader over stdin, created in run()
+        self._send_text_bytes = False  # ws.send(bytes, text=True) supported
+        self._transcript_fd = None
+        self._mentions_fd = None
+        self._raw_audio_fd = None  # Only opened when SAVE_RAW_AUDIO is set
+        self._raw_audio_pending = []
+        self._metadata = None  # Mirrors metadata.json once the meeting starts
+        self._ts_cache = (0, "", b"")  # (epoch second, "%H:%M:%S", b"[%H:%M:%S] ")
+        # (transcript line, mention line or None) tuples for _writer_loop;
+        # created in run() so it binds to the running loop on Python < 3.10
+        self._write_q = None
+
+        # Configure session for transcription-only mode
+        session_config = {
+            "type": "session.update",
+            "session": {
+                "modalities": ["text"],  # Text only, no audio response
+                "input_audio_transcription": {
+                    "model": TRANSCRIPTION_MODEL,
+                    "language": "en"
+                },
+                "turn_detection": {
+                    "type": "server_vad",
+                    "threshold": 0.5,
+                    "silence_duration_ms": 500,
+                    "create_response": False  # No AI response, just transcription
+                }
+            }
+        }
+        # Encoded once and resent as-is on every (re)connect
+        self._session_config_msg = json.dumps(session_config)
 
         # Load config if available
         self._load_config()
 
+        # Compile keyword checks once instead of scanning per keyword
+        self._mention_re = re.compile(
+            r"\b(" + "|".join(re.escape(k) for k in MENTION_KEYWORDS) + r")\b"
+            if MENTION_KEYWORDS else r"(?!)",
+            re.IGNORECASE
+        )
+        # Transcripts shorter than every keyword cannot contain a mention
+        self._min_mention_len = min(map(len, MENTION_KEYWORDS), default=0)
+
     def _load_config(self):
         """Load configuration from ~/.meeting-recorder.json"""
+        self._config = {}
         config_path = Path.home() / ".meeting-recorder.json"
         if config_path.exists():
             try:
                 with open(config_path) as f:
-                    config = json.load(f)
+                    self._config = json.load(f)
                 global MENTION_KEYWORDS
-                MENTION_KEYWORDS = config.get("mention_keywords", MENTION_KEYWORDS)
+                MENTION_KEYWORDS = self._config.get("mention_keywords", MENTION_KEYWORDS)
             except Exception:
-                pass
+                self._config = {}
 
     def setup_meeting_directory(self):
         """Create meeting directory and initialize files"""
@@ -76,8 +171,17 @@ class MeetingTranscriber:
         # Initialize mentions file
         self.mentions_path.write_text("")
 
+        # Keep both files open for the whole meeting. Lines are pre-encoded
+        # UTF-8 written with a single os.write each, so they land immediately
+        # and readers tailing the files stay current
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+        self._transcript_fd = os.open(self.transcript_path, flags, 0o644)
+        self._mentions_fd = os.open(self.mentions_path, flags, 0o644)
+        if SAVE_RAW_AUDIO:
+            self._raw_audio_fd = os.open(self.raw_audio_path, flags | os.O_TRUNC, 0o644)
+
         # Create metadata
-        metadata = {
+        self._metadata = {
             "meeting_id": self.meeting_id,
             "url": self.meeting_url,
             "started_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
@@ -85,8 +189,7 @@ class MeetingTranscriber:
             "participant_name": self._get_participant_name(),
             "status": "active"
         }
-        with open(self.metadata_path, "w") as f:
-            json.dump(metadata, f, indent=2)
+        write_json(self.metadata_path, self._metadata)
 
         # Update 'current' symlink
         current_link = Path(MEETINGS_DIR) / "current"
@@ -98,87 +201,57 @@ class MeetingTranscriber:
 
     def _get_participant_name(self) -> str:
         """Get participant name from config"""
-        config_path = Path.home() / ".meeting-recorder.json"
-        if config_path.exists():
-            try:
-                with open(config_path) as f:
-                    return json.load(f).get("participant_name", "Claude Assistant")
-            except Exception:
-                pass
-        return "Claude Assistant"
+        return self._config.get("participant_name", "Claude Assistant")
 
     async def connect(self):
         """Connect to Speaches WebSocket"""
         url = f"{SPEACHES_URL}?model={TRANSCRIPTION_MODEL}&intent=transcription"
         print(f"Connecting to Speaches: {url}", file=sys.stderr)
 
-        self.ws = await websockets.connect(url)
-
-        # Configure session for transcription-only mode
-        session_config = {
-            "type": "session.update",
-            "session": {
-                "modalities": ["text"],  # Text only, no audio response
-                "input_audio_transcription": {
-                    "model": TRANSCRIPTION_MODEL,
-                    "language": "en"
-                },
-                "turn_detection": {
-                    "type": "server_vad",
-                    "threshold": 0.5,
-                    "silence_duration_ms": 500,
-                    "create_response": False  # No AI response, just transcription
-                }
-            }
-        }
-        await self.ws.send(json.dumps(session_config))
+        # Server events are small JSON messages: skip permessage-deflate and
+        # bound the receive queue so a stalled consumer cannot grow memory
+        self.ws = await websockets.connect(
+            url,
+            compression=None,
+            max_queue=16,
+            max_size=2**20,
+            ping_interval=20,
+            ping_timeout=20
+        )
+        # websockets 14+ can send bytes as a text frame without decoding
+        self._send_text_bytes = "text" in inspect.signature(self.ws.send).parameters
+
+        await self.ws.send(self._session_config_msg)
         print("Session configured for transcription", file=sys.stderr)
 
         # Reset reconnect delay on successful connection
         self.reconnect_delay = 1
 
-    def _ws_is_open(self) -> bool:
-        """Check if websocket connection is open (compatible with various websockets versions)"""
-        if not self.ws:
-            return False
-        try:
-            # websockets 10+ uses state
-            if hasattr(self.ws, 'state'):
-                import websockets
-                return self.ws.state == websockets.protocol.State.OPEN
-            # Older versions use open
-            if hasattr(self.ws, 'open'):
-                return self.ws.open
-            return True  # Assume open if we can't check
-        except Exception:
-            return False
-
     async def send_audio(self):
         """Read audio from stdin and send to WebSocket"""
-        loop = asyncio.get_event_loop()
         bytes_per_chunk = CHUNK_SIZE * 2  # 16-bit audio = 2 bytes per sample
+        stream_ended = False
 
-        while self.running:
+        while self.running and not stream_ended:
             try:
                 # Read chunk from stdin (piped from parecord)
-                chunk = await loop.run_in_executor(
-                    None,
-                    sys.stdin.buffer.read,
-                    bytes_per_chunk
-                )
-
-                if not chunk:
-                    print("Audio stream ended", file=sys.stderr)
-                    break
-
-                if self.ws:
-                    # Encode and send
-                    audio_event = {
-                        "type": "input_audio_buffer.append",
-                        "audio": base64.b64encode(chunk).decode()
-                    }
+                try:
+                    chunk = await self._reader.readexactly(bytes_per_chunk)
+                except asyncio.IncompleteReadError as e:
+                    chunk = e.partial  # Stream ended mid-chunk
+                    stream_ended = True
+
+                if chunk and self._raw_audio_fd is not None:
+                    self._archive_audio(chunk)
+
+                if chunk and self.ws:
+                    # Encode and send; base64 needs no JSON escaping
+                    message = AUDIO_APPEND_PREFIX + base64.b64encode(chunk) + AUDIO_APPEND_SUFFIX
                     try:
-                        await self.ws.send(json.dumps(audio_event))
+                        if self._send_text_bytes:
+                            await self.ws.send(message, text=True)
+                        else:
+                            await self.ws.send(message.decode("ascii"))
                     except ConnectionClosed:
                         print("WebSocket closed while sending", file=sys.stderr)
                         await self._reconnect()
@@ -187,6 +260,27 @@ class MeetingTranscriber:
                 print(f"Error sending audio: {e}", file=sys.stderr)
                 break
 
+        if self._raw_audio_fd is not None:
+            self._flush_raw_audio()
+        if stream_ended:
+            print("Audio stream ended", file=sys.stderr)
+
+    def _archive_audio(self, chunk: bytes):
+        """Queue a chunk for audio.pcm, writing once a full batch is pending"""
+        self._raw_audio_pending.append(chunk)
+        if len(self._raw_audio_pending) >= RAW_AUDIO_BATCH:
+            self._flush_raw_audio()
+
+    def _flush_raw_audio(self):
+        """Append pending audio chunks to audio.pcm with a single syscall"""
+        if not self._raw_audio_pending:
+            return
+        try:
+            os.writev(self._raw_audio_fd, self._raw_audio_pending)
+        except OSError as e:
+            print(f"Error writing raw audio: {e}", file=sys.stderr)
+        self._raw_audio_pending.clear()
+
     async def receive_transcriptions(self):
         """Receive transcription events and write to file"""
         while self.running:
@@ -196,7 +290,7 @@ class MeetingTranscriber:
                     continue
 
                 message = await self.ws.recv()
-                event = json.loads(message)
+                event = json_loads(message)
 
                 event_type = event.get("type", "")
 
@@ -204,7 +298,7 @@ class MeetingTranscriber:
                 if event_type == "conversation.item.input_audio_transcription.completed":
                     transcript = event.get("transcript", "").strip()
                     if transcript:
-                        self._write_transcript(transcript)
+                        await self._write_transcript(transcript)
 
                 # Handle VAD events (optional logging)
                 elif event_type == "input_audio_buffer.speech_started":
@@ -224,54 +318,58 @@ class MeetingTranscriber:
                 print(f"Error receiving: {e}", file=sys.stderr)
                 await asyncio.sleep(1)
 
-    def _write_transcript(self, transcript: str):
-        """Write transcript line and check for mentions"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        line = f"[{timestamp}] {transcript}\n"
-
-        # Append to transcript file
-        with open(self.transcript_path, "a") as f:
-            f.write(line)
+    async def _write_transcript(self, transcript: str):
+        """Queue transcript line (and mention, if any) for the writer task"""
+        # Only reformat the timestamp when the second has changed
+        now = time.time()
+        sec = int(now)
+        if sec != self._ts_cache[0]:
+            timestamp = time.strftime("%H:%M:%S", time.localtime(now))
+            self._ts_cache = (sec, timestamp, f"[{timestamp}] ".encode("ascii"))
+        _, timestamp, prefix = self._ts_cache
+        line = prefix + transcript.encode("utf-8") + b"\n"
 
         # Also print to stderr for debugging
         print(f"[{timestamp}] {transcript}", file=sys.stderr)
 
         # Check for mentions/questions
-        self._check_mentions(timestamp, transcript)
+        mention_line = self._check_mentions(timestamp, transcript)
+
+        await self._write_q.put((line, mention_line))
 
     def _check_mentions(self, timestamp: str, transcript: str):
-        """Check if transcript contains mention keywords + question"""
-        lower_transcript = transcript.lower()
+        """Check if transcript contains mention keywords + question.
 
+        Returns the UTF-8 line to append to the mentions file, or None.
+        """
         # Check for keyword mentions
-        for keyword in MENTION_KEYWORDS:
-            if keyword.lower() in lower_transcript:
-                # Check if it's a question (contains ?)
-                is_question = "?" in transcript
-
-                # Also detect question phrases
-                question_phrases = [
-                    "what do you think",
-                    "can you",
-                    "could you",
-                    "would you",
-                    "do you know",
-                    "what about",
-                    "hey claude",
-                    "hey assistant"
-                ]
-                is_question = is_question or any(p in lower_transcript for p in question_phrases)
-
-                if is_question:
-                    mention_line = f"[{timestamp}] QUESTION: {transcript}\n"
-                else:
-                    mention_line = f"[{timestamp}] MENTION: {transcript}\n"
-
-                with open(self.mentions_path, "a") as f:
-                    f.write(mention_line)
-
-                print(f">>> MENTION DETECTED: {transcript}", file=sys.stderr)
+        if len(transcript) < self._min_mention_len:
+            return None
+        if not self._mention_re.search(transcript):
+            return None
+
+        # Question if it contains ? or a question phrase
+        is_question = "?" in transcript or QUESTION_RE.search(transcript) is not None
+
+        print(f">>> MENTION DETECTED: {transcript}", file=sys.stderr)
+
+        if is_question:
+            return f"[{timestamp}] QUESTION: {transcript}\n".encode("utf-8")
+        return f"[{timestamp}] MENTION: {transcript}\n".encode("utf-8")
+
+    async def _writer_loop(self):
+        """Drain queued lines to the transcript/mentions files until None"""
+        while True:
+            item = await self._write_q.get()
+            if item is None:
                 break
+            line, mention_line = item
+            try:
+                os.write(self._transcript_fd, line)
+                if mention_line:
+                    os.write(self._mentions_fd, mention_line)
+            except Exception as e:
+                print(f"Error writing transcript: {e}", file=sys.stderr)
 
     async def _reconnect(self):
         """Attempt to reconnect with exponential backoff"""
@@ -290,16 +388,14 @@ class MeetingTranscriber:
 
     def update_metadata_ended(self):
         """Update metadata when meeting ends"""
-        if self.metadata_path.exists():
-            try:
-                with open(self.metadata_path) as f:
-                    metadata = json.load(f)
-                metadata["ended_at"] = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
-                metadata["status"] = "ended"
-                with open(self.metadata_path, "w") as f:
-                    json.dump(metadata, f, indent=2)
-            except Exception as e:
-                print(f"Error updating metadata: {e}", file=sys.stderr)
+        if self._metadata is None:
+            return
+        self._metadata["ended_at"] = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+        self._metadata["status"] = "ended"
+        try:
+            write_json(self.metadata_path, self._metadata)
+        except Exception as e:
+            print(f"Error updating metadata: {e}", file=sys.stderr)
 
     async def run(self):
         """Main entry point"""
@@ -313,8 +409,17 @@ class MeetingTranscriber:
 
         # Setup meeting directory
         self.setup_meeting_directory()
+        self._write_q = asyncio.Queue(maxsize=256)
+        writer_task = asyncio.create_task(self._writer_loop())
 
         try:
+            # Read stdin through the event loop instead of a worker thread
+            self._reader = asyncio.StreamReader(limit=CHUNK_SIZE * 2 * 4)
+            await asyncio.get_running_loop().connect_read_pipe(
+                lambda: asyncio.StreamReaderProtocol(self._reader),
+                sys.stdin.buffer
+            )
+
             await self.connect()
 
             # Run send and receive concurrently
@@ -329,6 +434,15 @@ class MeetingTranscriber:
             self.running = False
             self.update_metadata_ended()
 
+            # Let the writer drain queued lines before closing the files
+            await self._write_q.put(None)
+            await writer_task
+            os.close(self._transcript_fd)
+            os.close(self._mentions_fd)
+            if self._raw_audio_fd is not None:
+                self._flush_raw_audio()
+                os.close(self._raw_audio_fd)
+
             if self.ws:
                 await self.ws.close()
 
@@ -345,10 +459,9 @@ class MeetingTranscriber:
 
 def extract_meeting_id(url: str) -> str:
     """Extract meeting ID from Google Meet URL"""
-    # Pattern: meet.google.com/xxx-yyyy-zzz
-    match = re.search(r'meet\.google\.com/([a-z]{3}-[a-z]{4}-[a-z]{3})', url.lower())
+    match = _MEET_ID_RE.search(url)
     if match:
-        return match.group(1)
+        return match.group(1).lower()
 
     # Fallback: use last path segment
     parts = url.rstrip('/').split('/')
@@ -367,6 +480,9 @@ def main():
     meeting_id = sys.argv[1]
     meeting_url = sys.argv[2] if len(sys.argv) > 2 else f"https://meet.google.com/{meeting_id}"
 
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
     transcriber = MeetingTranscriber(meeting_id, meeting_url)
     asyncio.run(transcriber.run())
 
@@ -65,19 +65,19 @@ echo -e "${BLUE}[2/6] Installing Python packages...${NC}"
 pip3 install --quiet --upgrade --break-system-packages \
     websockets \
     aiofiles \
-    requests \
+    "httpx[http2]" \
     2>/dev/null || \
 pip3 install --quiet --upgrade \
     websockets \
     aiofiles \
-    requests \
+    "httpx[http2]" \
     2>/dev/null || \
 pip install --quiet --upgrade --break-system-packages \
     websockets \
     aiofiles \
-    requests \
+    "httpx[http2]" \
     2>/dev/null || \
-echo -e "${YELLOW}Warning: pip install failed. Try: pip3 install --break-system-packages websockets aiofiles requests${NC}"
+echo -e "${YELLOW}Warning: pip install failed. Try: pip3 install --break-system-packages websockets aiofiles 'httpx[http2]'${NC}"
 
 echo -e "${GREEN}Python packages installed${NC}"
 
@@ -191,7 +191,7 @@ echo ""
 echo "Components installed:"
 echo "  - PulseAudio (audio routing)"
 echo "  - Speaches (speech-to-text on port 8000)"
-echo "  - Python packages (websockets, aiofiles, requests)"
+echo "  - Python packages (websockets, aiofiles, httpx)"
 echo ""
 echo "Quick start:"
 echo "  meeting-recorder join \"https://meet.google.com/xxx-yyyy-zzz\""